@@ -24,6 +24,7 @@ ICON_PATH = "dc.ico"
 DEFAULT_UDP_PORT = 7777
 # IMPORTANT: point HTTP base at the host root; use full paths per endpoint
 HTTP_BASE_TEMPLATE = "http://{ip}"
+TRANSPORT_LABELS = ("HTTP", "UDP")  # indexed by Transport.use_udp
 
 # ------------------- Firmware mirrors ---------------------
 MODES = [
@@ -173,6 +174,7 @@ class Transport(object):
         self.udp_port: int = DEFAULT_UDP_PORT
         self.use_udp: bool = True
         self.psk: Optional[str] = None
+        self._session = None  # requests.Session: keeps the HTTP connection alive
 
     def target_ok(self) -> bool:
         return bool(self.ip)
@@ -193,19 +195,24 @@ class Transport(object):
         finally:
             s.close()
 
+    def _http(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers["Connection"] = "keep-alive"
+        return self._session
+
     def http_get(self, path):
-        import requests
         base = HTTP_BASE_TEMPLATE.format(ip=self.ip)
         params = {"key": self.psk} if self.psk else None
-        r = requests.get(base + path, timeout=2.5, params=params)
+        r = self._http().get(base + path, timeout=2.5, params=params)
         r.raise_for_status()
         return r.text
 
     def http_post(self, path, body):
-        import requests
         base = HTTP_BASE_TEMPLATE.format(ip=self.ip)
         params = {"key": self.psk} if self.psk else None
-        r = requests.post(base + path, json=body, params=params, timeout=3.0)
+        r = self._http().post(base + path, json=body, params=params, timeout=3.0)
         r.raise_for_status()
         return r.text
 
@@ -604,7 +611,7 @@ class MainWindow(QWidget):
 
     def _toggle_udp(self, _):
         self.transport.use_udp = self.useUDP.isChecked()
-        self.status.setText("status: transport=%s" % ("UDP" if self.transport.use_udp else "HTTP"))
+        self.status.setText("status: transport=%s" % TRANSPORT_LABELS[self.transport.use_udp])
 
     def _toggle_manual(self, _):
         en = self.manualOverride.isChecked()
@@ -3,7 +3,7 @@
 # Place at: Q:\system\scripts\XBOX RGB\default.py
 from __future__ import print_function
 
-import socket, time
+import socket, select, sys, time, threading
 try:
     import json as _json
 except Exception:
@@ -11,13 +11,36 @@ except Exception:
         import simplejson as _json
     except Exception:
         _json = None
+try:
+    import Queue as _queue
+except ImportError:
+    import queue as _queue
+try:
+    from cStringIO import StringIO as _StringIO
+except ImportError:
+    from io import StringIO as _StringIO
 
 import xbmc
 import xbmcgui
 
+# decide the str/bytes model once instead of probing for NameError per call
+_PY2 = sys.version_info[0] == 2
+if _PY2:
+    _UNICODE, _INTS = unicode, (int, long)
+else:
+    _UNICODE, _INTS = str, (int,)
+
 # -------- protocol / constants (ASCII only text) --------
 UDP_PORT = 7777
 DISCOVERY_PREFIX = 'RGBDISC! '  # unit may prefix adverts like "RGBDISC! {json}"
+_DISC_PREFIX_B = DISCOVERY_PREFIX.encode('ascii')
+PREVIEW_DEBOUNCE = 0.04         # seconds of quiet before a trailing preview is sent
+DISCOVERY_SETTLE = 0.4          # stop scanning this long after the last new device
+# common home subnets, probed only when no local interface address is found
+# (old Python / Xbox stack); the limited broadcast is always probed
+FALLBACK_BCAST = ['192.168.0.255', '192.168.1.255', '10.0.0.255']
+# string escapes for the fallback JSON writer (backslash must come first)
+_ESCAPE = (('\\', '\\\\'), ('"', '\\"'), ('\n', '\\n'), ('\r', '\\r'), ('\t', '\\t'))
 
 MODES = [
     (0, 'Solid'), (1, 'Breathe'), (2, 'Color Wipe'), (3, 'Larson'),
@@ -28,6 +51,7 @@ MODES = [
 ]
 MODE_VALUES = [v for v,_ in MODES]
 MODE_NAMES  = [n for _,n in MODES]
+MODE_NAME_BY_VALUE = dict(MODES)
 
 # 16-color preset palette (RRGGBB ints)
 COLOR_PALETTE = [
@@ -49,6 +73,22 @@ COLOR_PALETTE = [
     ('ColdWhite',   0xD0E7FF),
 ]
 COLOR_NAMES = [n for n,_ in COLOR_PALETTE]
+HEX_BY_RGB = dict([(rgb, '#%06X' % rgb) for _,rgb in COLOR_PALETTE])
+PALETTE_LABELS = ['%-10s  #%06X' % (n, rgb) for n,rgb in COLOR_PALETTE]
+
+# Fixed main-menu rows (built once, reused on every redraw)
+M_RESCAN    = 'Rescan'
+M_MANUAL_IP = 'Manual IP'
+M_SET_PSK   = 'Set PSK'
+M_SEP       = '-----'
+M_EDIT_SEQ  = 'Custom: Edit playlist (JSON)'
+M_PREVIEW   = 'Preview now'
+M_SAVE      = 'Save to device'
+M_RESET     = 'Reset device'
+M_QUIT      = 'Quit'
+_QUIT = object()  # sentinel action for the Quit row
+ONOFF    = ('Off', 'On')
+TMPL_REV = ('Reverse CH1: %s', 'Reverse CH2: %s', 'Reverse CH3: %s', 'Reverse CH4: %s')
 
 # Defaults mirror firmware (incl. per-channel reverse)
 DEFAULT_CFG = {
@@ -80,7 +120,36 @@ def _notify(title, msg):
     except Exception:
         pass
 
-def _hex24(n): return '#%06X' % (int(n) & 0xFFFFFF)
+def _hex24(n):
+    n = int(n) & 0xFFFFFF
+    return HEX_BY_RGB.get(n) or ('#%06X' % n)
+
+def _broadcast_addrs():
+    """Best-effort /24 broadcast address of each local interface, plus
+    255.255.255.255; common subnets stand in when none can be found."""
+    ips = []
+    try: ips.extend(socket.gethostbyname_ex(socket.gethostname())[2])
+    except Exception: pass
+    try:
+        # no packet is sent; this just asks the stack which source IP it would use
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            s.connect(('10.255.255.255', 1))
+            ips.append(s.getsockname()[0])
+        finally:
+            s.close()
+    except Exception:
+        pass
+    out = []
+    for ip in ips:
+        parts = ip.split('.')
+        if len(parts) != 4 or parts[0] in ('127', '0'): continue
+        b = '.'.join(parts[:3] + ['255'])
+        if b not in out: out.append(b)
+    if not out:
+        out.extend(FALLBACK_BCAST)
+    out.append('255.255.255.255')
+    return out
 
 # ---- Dialog compatibility wrappers (no keyword args) ----
 def dlg_select(heading, options):
@@ -111,6 +180,11 @@ def dlg_numeric(n_type, heading, default_text=''):
 class UdpClient(object):
     def __init__(self, psk=''):
         self.psk = psk or ''
+        self._sock = None       # connected unicast socket, reused for every op
+        self._sock_key = None   # (ip, port) the cached socket is connected to
+        self._lock = threading.Lock()  # previews may be flushed from a timer thread
+        self._disc_sock = None  # bound broadcast socket, kept across rescans
+        self._last_preview = None  # bytes of the last preview sent to _sock_key
 
     def _bind_sock(self):
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -123,36 +197,65 @@ class UdpClient(object):
         s.settimeout(0.5)
         return s
 
-    def discover(self, timeout=3.5):
-        s = self._bind_sock()
+    def _discover_sock(self):
+        s = self._disc_sock
+        if s is None:
+            s = self._disc_sock = self._bind_sock()
+        else:
+            self._drain(s)  # forget adverts queued since the last scan
+            s.settimeout(0.5)
+        return s
+
+    def _drop_discover_sock(self):
+        if self._disc_sock is not None:
+            try: self._disc_sock.close()
+            except Exception: pass
+        self._disc_sock = None
+
+    def discover(self, timeout=1.5):
+        s = self._discover_sock()
         devices, seen = [], set()
+        # Probe every interface back-to-back (both JSON and plain-text forms for
+        # compatibility) so all replies land inside one shared receive window
+        probe = self._dumps_bytes({'op':'discover'})
+        for addr in _broadcast_addrs():
+            try:
+                s.sendto(probe, (addr, UDP_PORT))
+                s.sendto(b'RGBDISC?', (addr, UDP_PORT))
+            except socket.error:
+                pass
         end = time.time() + timeout
-        # Probe both JSON and plain-text forms for compatibility
-        try: s.sendto(self._dumps_bytes({'op':'discover'}), ('255.255.255.255', UDP_PORT))
-        except Exception: pass
-        try: s.sendto(b'RGBDISC?', ('255.255.255.255', UDP_PORT))
-        except Exception: pass
-        while time.time() < end:
+        buf = bytearray(2048)   # one receive buffer for the whole scan
+        view = memoryview(buf)
+        settle = None           # set once a device answers
+        while True:
+            now = time.time()
+            left = end - now
+            if settle is not None: left = min(left, settle - now)
+            if left <= 0: break
             try:
-                data, (rip, rport) = s.recvfrom(2048)
+                r, _, _ = select.select([s], [], [], left)
+                if not r: break
+                n, (rip, rport) = s.recvfrom_into(buf, 2048)
             except socket.timeout:
                 continue
             except Exception:
+                self._drop_discover_sock()  # rebuilt on the next scan
                 break
-            if not data: continue
+            if n < 2: continue
+            data = view[:n].tobytes().lstrip()
+            # Only parse what can be ours: bare JSON or "RGBDISC! {json}";
+            # SSDP/mDNS/DHCP chatter is dropped without touching the decoder
+            if data.startswith(_DISC_PREFIX_B):
+                data = data[len(_DISC_PREFIX_B):]
+            elif data[:1] not in (b'{', b'['):
+                continue
             js = self._loads_robust(data)
-            if not isinstance(js, dict):
-                # handle "RGBDISC! {json}"
-                try:
-                    txt = data.decode('utf-8')
-                except Exception:
-                    try: txt = data.decode('latin-1')
-                    except Exception: txt = ''
-                if txt.startswith(DISCOVERY_PREFIX):
-                    js = self._loads_robust(txt[len(DISCOVERY_PREFIX):])
             if not isinstance(js, dict):
                 continue
-            # Accept with or without "ok": true
+            # Accept with or without "ok": true; a bare {"op":"discover"} is our
+            # own probe looped back by the broadcast
+            if len(js) == 1: continue
             if js.get('op') == 'discover' and (js.get('ok') in (None, True)):
                 ip   = js.get('ip') or rip
                 port = int(js.get('port') or UDP_PORT)
@@ -162,94 +265,172 @@ class UdpClient(object):
                 if key in seen: continue
                 seen.add(key)
                 devices.append({'name': name, 'ip': ip, 'port': port, 'mac': mac, 'ver': js.get('ver','')})
-        try: s.close()
-        except Exception: pass
+                settle = time.time() + DISCOVERY_SETTLE
         return devices
 
-    def _send_recv(self, ip, port, body, timeout=1.2):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(timeout)
+    def _get_sock(self, ip, port):
+        key = (ip, int(port))
+        if self._sock is not None and key == self._sock_key:
+            return self._sock
+        self._drop_sock()
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # small send buffer so stale previews don't queue; TOS low-delay hint
+        try: s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        except Exception: pass
+        try: s.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, 0x10)
+        except Exception: pass
+        s.settimeout(1.2)
+        s.connect(key)
+        self._sock, self._sock_key = s, key
+        return s
+
+    def _drop_sock(self):
+        if self._sock is not None:
+            try: self._sock.close()
+            except Exception: pass
+        self._sock = None
+        self._sock_key = None
+        self._last_preview = None
+
+    def close(self):
+        self._drop_sock()
+        self._drop_discover_sock()
+
+    def _drain(self, s):
+        """Drop queued datagrams (e.g. unread preview/save acks) before a request."""
+        s.settimeout(0.0)
         try:
-            payload = dict(body)
-            if self.psk: payload['key'] = self.psk
-            msg = self._dumps_bytes(payload)
-            sock.sendto(msg, (ip, port))
-            data, _ = sock.recvfrom(4096)
-            return self._loads_robust(data)
+            while True: s.recv(4096)
         except Exception:
-            return None
+            pass
+
+    def _send_recv(self, ip, port, body, timeout=1.2):
+        op = body.get('op')
+        self._lock.acquire()
+        try:
+            try:
+                msg = self._encode(body)
+                s = self._get_sock(ip, port)
+                self._drain(s)
+                s.settimeout(timeout)
+                s.send(msg)
+                end = time.time() + timeout
+                while True:
+                    js = self._loads_robust(s.recv(4096))
+                    # skip only a late preview/save ack that raced the drain; error
+                    # replies ({"ok":false,"op":"auth"|"parse"|...}) are returned
+                    if not (isinstance(js, dict) and js.get('op') in ('preview', 'save')
+                            and js.get('op') != op):
+                        return js
+                    left = end - time.time()
+                    if left <= 0: return None
+                    s.settimeout(left)
+            except socket.timeout:
+                return None
+            except Exception:
+                # e.g. ICMP port unreachable on a connected socket: rebuild next time
+                self._drop_sock()
+                return None
         finally:
-            try: sock.close()
-            except Exception: pass
+            self._lock.release()
 
-    def _send_only(self, ip, port, body):
-        """Fire-and-forget (no reply expected)."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    def _send_only(self, ip, port, body, dedupe=False):
+        """Fire-and-forget (no reply expected). dedupe: skip a repeat of the last preview."""
+        self._lock.acquire()
         try:
-            payload = dict(body)
-            if self.psk: payload['key'] = self.psk
-            msg = self._dumps_bytes(payload)
-            sock.sendto(msg, (ip, port))
-            return True
-        except Exception:
-            return False
+            try:
+                msg = self._encode(body)
+                s = self._get_sock(ip, port)
+                if dedupe and msg == self._last_preview:
+                    return True
+                s.send(msg)
+                if dedupe: self._last_preview = msg
+                return True
+            except Exception:
+                self._drop_sock()
+                return False
         finally:
-            try: sock.close()
-            except Exception: pass
+            self._lock.release()
 
     def get(self, ip, port):
         r = self._send_recv(ip, port, {'op':'get'})
         if not r: return None
-        return r.get('cfg') if isinstance(r, dict) and 'cfg' in r else r
-
-    # preview/save: do NOT wait for a reply (firmware typically sends none)
-    def preview(self, ip, port, cfg): return self._send_only(ip, port, {'op':'preview','cfg':cfg})
-    def save(self, ip, port, cfg):    return self._send_only(ip, port, {'op':'save','cfg':cfg})
-    def reset(self, ip, port):        r=self._send_recv(ip, port, {'op':'reset'}); return bool(r and r.get('ok'))
+        cfg = r.get('cfg') if isinstance(r, dict) and 'cfg' in r else r
+        if isinstance(cfg, dict):
+            # the unit may have been changed elsewhere (WebUI, PC app); its state
+            # no longer matches the last preview, so don't skip a re-send of it
+            self._last_preview = None
+        return cfg
+
+    # preview: fire-and-forget, never waits on the unit's ack
+    def preview(self, ip, port, cfg, force=False):
+        return self._send_only(ip, port, {'op':'preview','cfg':cfg}, dedupe=not force)
+    def save(self, ip, port, cfg):
+        """Save waits for the ack (1 retry); App calls it from its worker thread.
+        Returns True (ok), False (unit rejected it) or None (no reply)."""
+        for _ in range(2):
+            r = self._send_recv(ip, port, {'op':'save','cfg':cfg}, 0.6)
+            if isinstance(r, dict): return bool(r.get('ok'))
+        return None
+    def reset(self, ip, port):
+        self._last_preview = None   # device state no longer matches it
+        r=self._send_recv(ip, port, {'op':'reset'}); return bool(r and r.get('ok'))
 
     # json helpers kept inside the class to avoid name clashes
+    def _encode(self, body):
+        """Encode body, adding the PSK (on a copy) only when one is set."""
+        if self.psk:
+            payload = dict(body)
+            payload['key'] = self.psk
+            return self._dumps_bytes(payload)
+        return self._dumps_bytes(body)
+
     def _dumps_bytes(self, obj):
         if _json:
             s = _json.dumps(obj, separators=(',',':'))
-            try:
-                if isinstance(s, unicode): s = s.encode('utf-8')
-            except NameError:
-                pass
+            if isinstance(s, _UNICODE): s = s.encode('utf-8')
             return s
-        # very small fallback
-        parts = []
-        for k, v in obj.items():
-            if isinstance(v, (int, long)): vv = str(v)
-            elif isinstance(v, bool):       vv = 'true' if v else 'false'
+        # very small fallback: stream everything into one buffer
+        buf = _StringIO()
+        w = buf.write
+        def esc(t):
+            for ch, rp in _ESCAPE:
+                if ch in t: t = t.replace(ch, rp)
+            return t
+        def enc(v):
+            if v is True:    w('true')
+            elif v is False: w('false')
+            elif v is None:  w('null')
+            elif isinstance(v, _INTS + (float,)): w(str(v))
             elif isinstance(v, dict):
-                vv = self._dumps_bytes(v)
-                if isinstance(vv, bytes):
-                    try: vv = vv.decode('utf-8')
-                    except Exception: vv = str(vv)
+                w('{')
+                first = True
+                for k, vv in v.items():
+                    if not first: w(',')
+                    first = False
+                    w('"'); w(esc(str(k))); w('":')
+                    enc(vv)
+                w('}')
             elif isinstance(v, (list, tuple)):
-                vv = '[' + ','.join([self._to_json_scalar(x) for x in v]) + ']'
-            else: vv = '"%s"' % str(v).replace('"','\\"')
-            parts.append('"%s":%s' % (k, vv))
-        s = '{' + ','.join(parts) + '}'
+                w('[')
+                first = True
+                for x in v:
+                    if not first: w(',')
+                    first = False
+                    enc(x)
+                w(']')
+            else:
+                w('"'); w(esc(str(v))); w('"')
+        enc(obj)
+        s = buf.getvalue()
         try: return s.encode('utf-8')
         except Exception: return s
 
-    def _to_json_scalar(self, v):
-        if isinstance(v, (int, long)): return str(v)
-        if isinstance(v, bool): return 'true' if v else 'false'
-        return '"%s"' % str(v).replace('"','\\"')
-
     def _loads_robust(self, b):
         if not _json: return None
-        try:
-            if isinstance(b, unicode):
-                t = b
-            else:
-                try: t = b.decode('utf-8')
-                except Exception:
-                    try: t = b.decode('latin-1')
-                    except Exception: return None
-        except NameError:
+        if isinstance(b, _UNICODE):
+            t = b
+        else:
             try: t = b.decode('utf-8')
             except Exception:
                 try: t = b.decode('latin-1')
@@ -263,11 +444,20 @@ class App(object):
         self.net = UdpClient()
         self.dev = None
         self.cfg = dict(DEFAULT_CFG)
+        self._pending_cfg = None    # newest cfg snapshot waiting to be previewed
+        self._last_send = 0.0
+        self._timer = None          # single-shot trailing-edge flush
+        self._plock = threading.Lock()
+        # preview/save go out on a worker so a slow or lost packet never stalls the GUI
+        self._q = _queue.Queue(8)
+        self._worker = threading.Thread(target=self._pump)
+        self._worker.setDaemon(True)
+        self._worker.start()
 
     # ---- device discovery / selection ----
     def pick_device(self):
         _notify('XBOX RGB', 'Searching...')
-        devs = self.net.discover(timeout=3.5)
+        devs = self.net.discover()
         if not devs:
             ip = dlg_input('Enter device IP', '', xbmcgui.INPUT_IPADDRESS)
             if not ip:
@@ -290,20 +480,24 @@ class App(object):
                 self.net.psk = (psk or '').strip()
                 c = self.net.get(self.dev['ip'], int(self.dev['port']))
         if isinstance(c, dict):
-            # ensure required keys exist / normalized
-            self.cfg.update(c)
-            rv = self.cfg.get('reverse')
-            if not (isinstance(rv, list) and len(rv) >= 4):
-                # default to firmware's compiled defaults if missing
-                self.cfg['reverse'] = [True, False, False, True]
-            # ensure new keys exist if device is older
-            if 'masterOff'   not in self.cfg: self.cfg['masterOff'] = False
-            if 'customLoop'  not in self.cfg: self.cfg['customLoop'] = True
-            if 'customSeq'   not in self.cfg: self.cfg['customSeq']  = '[]'
+            self._merge_cfg(c)
         else:
             _notify('XBOX RGB', 'Could not fetch config; using defaults')
         return True
 
+    def _merge_cfg(self, c):
+        """Apply a device cfg, then fill anything an older unit omits (or sends
+        as null) from DEFAULT_CFG so the menu can index self.cfg directly."""
+        cfg = self.cfg
+        cfg.update(c)
+        for k, v in DEFAULT_CFG.items():
+            if cfg.get(k) is None: cfg[k] = v
+        for k in ('reverse', 'count'):
+            v = cfg[k]
+            if not (isinstance(v, list) and len(v) >= 4):
+                # fall back to firmware's compiled defaults
+                cfg[k] = list(DEFAULT_CFG[k])
+
     # ---- menu helpers ----
     def _title(self):
         dev = '%s @ %s' % (self.dev.get('name','?'), self.dev.get('ip','?')) if self.dev else 'No device'
@@ -313,14 +507,13 @@ class App(object):
         return 'XBOX RGB - %s' % dev
 
     def _mode_name(self, v):
-        try: return MODE_NAMES[MODE_VALUES.index(int(v))]
+        try: return MODE_NAME_BY_VALUE.get(int(v), 'Solid')
         except Exception: return 'Solid'
 
     # ---- color palette picker (no custom) ----
     def pick_color_from_palette(self, title, current_value):
         """Show 16 preset colors only. Returns int 0xRRGGBB or None (cancel)."""
-        items = ['%-10s  %s' % (name, _hex24(rgb)) for name, rgb in COLOR_PALETTE]
-        sel = dlg_select(title, items)
+        sel = dlg_select(title, PALETTE_LABELS)
         if sel < 0:
             return None
         return COLOR_PALETTE[sel][1]
@@ -357,22 +550,20 @@ class App(object):
             self.preview()
 
     def set_counts(self):
-        counts = list(self.cfg.get('count') or [0,0,0,0]) + [0,0,0,0]
-        labels = ['CH1 Count','CH2 Count','CH3 Count','CH4 Count']
-        for i in range(4):
-            cur = int(counts[i])
-            val = dlg_numeric(0, '%s (0-50)' % labels[i], str(cur))
-            try:
-                if val not in (None, ''):
-                    counts[i] = max(0, min(50, int(val)))
-            except Exception:
-                pass
-        self.cfg['count'] = counts[:4]
+        """All four channel counts in one prompt, e.g. '50,50,30,0'."""
+        counts = (list(self.cfg.get('count') or [0,0,0,0]) + [0,0,0,0])[:4]
+        txt = dlg_input('CH1,CH2,CH3,CH4 Count (0-50)', '%d,%d,%d,%d' % tuple(counts), xbmcgui.INPUT_ALPHANUM)
+        if not txt: return
+        parts = txt.split(',')
+        for i in range(min(4, len(parts))):
+            try: counts[i] = max(0, min(50, int(parts[i].strip())))
+            except Exception: pass   # keep the current value for a bad field
+        self.cfg['count'] = counts
         self.preview()
 
     def toggle(self, key, title):
         self.cfg[key] = not bool(self.cfg.get(key, False))
-        _notify('XBOX RGB', '%s: %s' % (title, 'On' if self.cfg[key] else 'Off'))
+        _notify('XBOX RGB', '%s: %s' % (title, ONOFF[bool(self.cfg[key])]))
         self.preview()
 
     def toggle_reverse(self, ch_index):
@@ -380,18 +571,18 @@ class App(object):
         while len(rv) < 4: rv.append(False)
         rv[ch_index] = not bool(rv[ch_index])
         self.cfg['reverse'] = rv
-        _notify('XBOX RGB', 'Reverse CH%d: %s' % (ch_index+1, 'On' if rv[ch_index] else 'Off'))
+        _notify('XBOX RGB', TMPL_REV[ch_index] % ONOFF[bool(rv[ch_index])])
         self.preview()
 
     # ---- new: master off / custom playlist ----
     def toggle_master_off(self):
         self.cfg['masterOff'] = not bool(self.cfg.get('masterOff', False))
-        _notify('XBOX RGB', 'Master Off: %s' % ('On' if self.cfg['masterOff'] else 'Off'))
+        _notify('XBOX RGB', 'Master Off: %s' % ONOFF[bool(self.cfg['masterOff'])])
         self.preview()
 
     def toggle_custom_loop(self):
         self.cfg['customLoop'] = not bool(self.cfg.get('customLoop', True))
-        _notify('XBOX RGB', 'Custom Loop: %s' % ('On' if self.cfg['customLoop'] else 'Off'))
+        _notify('XBOX RGB', 'Custom Loop: %s' % ONOFF[bool(self.cfg['customLoop'])])
         # keep mode as-is; preview to reflect new loop flag (if already in custom)
         self.preview()
 
@@ -413,25 +604,100 @@ class App(object):
 
     # ---- device actions ----
     def preview(self):
+        """Coalesce bursts: send now if idle, else once after PREVIEW_DEBOUNCE of quiet."""
         if not self.dev: return
-        try: self.net.preview(self.dev['ip'], int(self.dev['port']), self.cfg)
-        except Exception: pass
+        self._plock.acquire()
+        try:
+            self._pending_cfg = dict(self.cfg)
+            if time.time() - self._last_send < PREVIEW_DEBOUNCE:
+                if self._timer is None:
+                    self._timer = threading.Timer(PREVIEW_DEBOUNCE, self._flush_preview)
+                    self._timer.setDaemon(True)
+                    self._timer.start()
+                return
+        finally:
+            self._plock.release()
+        self._flush_preview()
+
+    def _flush_preview(self):
+        self._plock.acquire()
+        try:
+            self._timer = None
+            cfg, self._pending_cfg = self._pending_cfg, None
+            self._last_send = time.time()
+        finally:
+            self._plock.release()
+        if cfg is None or not self.dev: return
+        try:
+            self._q.put_nowait(('preview', self.dev, cfg))
+        except _queue.Full:
+            # worker backed up: keep this as the newest pending cfg and retry later
+            self._plock.acquire()
+            try:
+                if self._pending_cfg is None: self._pending_cfg = cfg
+                if self._timer is None:
+                    self._timer = threading.Timer(PREVIEW_DEBOUNCE, self._flush_preview)
+                    self._timer.setDaemon(True)
+                    self._timer.start()
+            finally:
+                self._plock.release()
+
+    def preview_now(self):
+        """Explicit 'Preview now': bypass the debounce and the unchanged-cfg skip."""
+        if not self.dev: return
+        self._cancel_preview()
+        self._q.put(('preview!', self.dev, dict(self.cfg)))
+
+    def _pump(self):
+        """Worker: send queued (op, dev, cfg) items in order; None stops it."""
+        while True:
+            item = self._q.get()
+            try:
+                if item is None: return
+                op, dev, cfg = item
+                ip, port = dev['ip'], int(dev['port'])
+                if op == 'save':
+                    ok = self.net.save(ip, port, cfg)
+                    if ok:
+                        _notify('XBOX RGB', 'Saved')
+                    elif ok is not None:
+                        _notify('XBOX RGB', 'Save rejected (check PSK)')
+                    else:
+                        # Even if no reply, changes were sent; tell user to verify visually
+                        _notify('XBOX RGB', 'Save sent (no reply)')
+                else:
+                    self.net.preview(ip, port, cfg, op == 'preview!')
+            except Exception:
+                # a dropped preview is harmless; a failed save is not
+                if item and item[0] == 'save':
+                    _notify('XBOX RGB', 'Save failed')
+            finally:
+                self._q.task_done()
+
+    def _cancel_preview(self):
+        self._plock.acquire()
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending_cfg = None
+        finally:
+            self._plock.release()
 
     def save(self):
         if not self.dev: return
+        self._cancel_preview()  # save carries the full cfg anyway
         _notify('XBOX RGB', 'Saving...')
-        if self.net.save(self.dev['ip'], int(self.dev['port']), self.cfg):
-            _notify('XBOX RGB', 'Saved')
-        else:
-            # Even if no reply, changes were sent; tell user to verify visually
-            _notify('XBOX RGB', 'Save sent (no reply)')
+        self._q.put(('save', self.dev, dict(self.cfg)))  # never dropped; worker reports
 
     def reset(self):
         if not self.dev: return
         if xbmcgui.Dialog().yesno('Reset', 'Reset device to defaults?'):
+            self._cancel_preview()
+            self._q.join()  # let queued previews land first so none override the reset
             if self.net.reset(self.dev['ip'], int(self.dev['port'])):
                 c = self.net.get(self.dev['ip'], int(self.dev['port'])) or {}
-                if isinstance(c, dict): self.cfg.update(c)
+                if isinstance(c, dict): self._merge_cfg(c)
                 _notify('XBOX RGB', 'Reset OK')
             else:
                 _notify('XBOX RGB', 'Reset failed')
@@ -441,14 +707,7 @@ class App(object):
         if ip:
             self.dev = {'ip': ip, 'port': UDP_PORT, 'name':'XBOX RGB', 'mac':'', 'ver': ''}
             c = self.net.get(self.dev['ip'], int(self.dev['port'])) or {}
-            if isinstance(c, dict): self.cfg.update(c)
-            # ensure reverse exists
-            if not (isinstance(self.cfg.get('reverse'), list) and len(self.cfg['reverse']) >= 4):
-                self.cfg['reverse'] = [True, False, False, True]
-            # ensure new keys exist if device is older
-            if 'masterOff'   not in self.cfg: self.cfg['masterOff'] = False
-            if 'customLoop'  not in self.cfg: self.cfg['customLoop'] = True
-            if 'customSeq'   not in self.cfg: self.cfg['customSeq']  = '[]'
+            if isinstance(c, dict): self._merge_cfg(c)
 
     def set_psk(self):
         psk = dlg_input('PSK', '', xbmcgui.INPUT_ALPHANUM)
@@ -456,89 +715,90 @@ class App(object):
             self.net.psk = (psk or '').strip()
             if self.dev:
                 c = self.net.get(self.dev['ip'], int(self.dev['port'])) or {}
-                if isinstance(c, dict): self.cfg.update(c)
+                if isinstance(c, dict): self._merge_cfg(c)
 
     def rescan(self):
         self.pick_device()
 
     # ---- main loop ----
     def run(self):
+        try:
+            self._run()
+        finally:
+            self._cancel_preview()
+            self._q.put(None)        # finish queued sends (e.g. a save), then stop
+            self._worker.join(2.0)
+            self.net.close()
+
+    def _menu_rows(self):
+        """Main-menu rows as (cfg key, label, action); label is a str or a fn(cfg)."""
+        rows = []
+        def add(label, fn=None, key=None):
+            rows.append((key, label, fn))
+        add(lambda c: 'Device:  %s @ %s' % (self.dev.get('name','XBOX RGB'), self.dev.get('ip','?')))
+        add(M_RESCAN,    self.rescan)
+        add(M_MANUAL_IP, self.set_manual_ip)
+        add(M_SET_PSK,   self.set_psk)
+        add(M_SEP)
+        add(lambda c: 'Mode: %s' % self._mode_name(c['mode']),        self.set_mode, 'mode')
+        add(lambda c: 'Master Off: %s' % ONOFF[bool(c['masterOff'])], self.toggle_master_off, 'masterOff')
+        add(lambda c: 'Brightness: %d' % int(c['brightness']), lambda: self.set_slider('brightness','Brightness',1,255), 'brightness')
+        add(lambda c: 'Speed: %d' % int(c['speed']),           lambda: self.set_slider('speed','Speed',0,255), 'speed')
+        add(lambda c: 'Intensity: %d' % int(c['intensity']),   lambda: self.set_slider('intensity','Intensity',0,255), 'intensity')
+        add(lambda c: 'Width / Gap: %d' % int(c['width']),   lambda: self.set_slider('width','Width / Gap',1,20), 'width')
+        add(M_SEP)
+        add(lambda c: 'Primary: %s' % _hex24(c['colorA']),   lambda: self.set_color('colorA','Primary'), 'colorA')
+        add(lambda c: 'Secondary: %s' % _hex24(c['colorB']), lambda: self.set_color('colorB','Secondary'), 'colorB')
+        add(lambda c: 'Color C: %s' % _hex24(c['colorC']),   lambda: self.set_color('colorC','Color C'), 'colorC')
+        add(lambda c: 'Color D: %s' % _hex24(c['colorD']),   lambda: self.set_color('colorD','Color D'), 'colorD')
+        add(lambda c: 'Palette Size: %d' % int(c['paletteCount']), self.set_palette, 'paletteCount')
+        add(lambda c: 'Channel Counts: %s' % c['count'],         self.set_counts, 'count')
+        # NEW: per-channel reverse toggles
+        add(lambda c: TMPL_REV[0] % ONOFF[bool(c['reverse'][0])], lambda: self.toggle_reverse(0), 'reverse')
+        add(lambda c: TMPL_REV[1] % ONOFF[bool(c['reverse'][1])], lambda: self.toggle_reverse(1), 'reverse')
+        add(lambda c: TMPL_REV[2] % ONOFF[bool(c['reverse'][2])], lambda: self.toggle_reverse(2), 'reverse')
+        add(lambda c: TMPL_REV[3] % ONOFF[bool(c['reverse'][3])], lambda: self.toggle_reverse(3), 'reverse')
+        # Custom mode controls (always visible; useful to prep then switch modes)
+        add(M_SEP)
+        add(lambda c: 'Custom: Loop: %s' % ONOFF[bool(c['customLoop'])], self.toggle_custom_loop, 'customLoop')
+        add(M_EDIT_SEQ, self.edit_custom_seq)
+        add(M_SEP)
+        add(lambda c: 'Resume On Boot: %s' % ONOFF[bool(c['resumeOnBoot'])], lambda: self.toggle('resumeOnBoot','Resume On Boot'), 'resumeOnBoot')
+        add(lambda c: 'SMBus CPU: %s' % ONOFF[bool(c['enableCpu'])],        lambda: self.toggle('enableCpu','SMBus CPU'), 'enableCpu')
+        add(lambda c: 'SMBus FAN: %s' % ONOFF[bool(c['enableFan'])],        lambda: self.toggle('enableFan','SMBus FAN'), 'enableFan')
+        add(M_SEP)
+        add(M_PREVIEW, self.preview_now)
+        add(M_SAVE,    self.save)
+        add(M_RESET,   self.reset)
+        add(M_QUIT,    _QUIT)
+        return rows
+
+    def _run(self):
         if not self.pick_device():
             return
+        rows = self._menu_rows()
+        actions = [fn for _, _, fn in rows]
+        entries, dev, before = None, None, None
         while True:
             c = self.cfg
-            rv = list(c.get('reverse') or [False,False,False,False]) + [False,False,False,False]
-            entries = [
-                'Device:  %s @ %s' % (self.dev.get('name','XBOX RGB'), self.dev.get('ip','?')),
-                'Rescan',
-                'Manual IP',
-                'Set PSK',
-                '-----',
-                'Mode: %s' % self._mode_name(c.get('mode',0)),
-                'Master Off: %s' % ('On' if c.get('masterOff') else 'Off'),
-                'Brightness: %d' % int(c.get('brightness',128)),
-                'Speed: %d' % int(c.get('speed',128)),
-                'Intensity: %d' % int(c.get('intensity',128)),
-                'Width / Gap: %d' % int(c.get('width',5)),
-                '-----',
-                'Primary: %s' % _hex24(c.get('colorA',0x00FF00)),
-                'Secondary: %s' % _hex24(c.get('colorB',0x0000FF)),
-                'Color C: %s' % _hex24(c.get('colorC',0x000000)),
-                'Color D: %s' % _hex24(c.get('colorD',0x000000)),
-                'Palette Size: %d' % int(c.get('paletteCount',2)),
-                'Channel Counts: %s' % (c.get('count') or [0,0,0,0]),
-                # NEW: per-channel reverse toggles
-                'Reverse CH1: %s' % ('On' if rv[0] else 'Off'),
-                'Reverse CH2: %s' % ('On' if rv[1] else 'Off'),
-                'Reverse CH3: %s' % ('On' if rv[2] else 'Off'),
-                'Reverse CH4: %s' % ('On' if rv[3] else 'Off'),
-                # Custom mode controls (always visible; useful to prep then switch modes)
-                '-----',
-                'Custom: Loop: %s' % ('On' if c.get('customLoop') else 'Off'),
-                'Custom: Edit playlist (JSON)',
-                '-----',
-                'Resume On Boot: %s' % ('On' if c.get('resumeOnBoot') else 'Off'),
-                'SMBus CPU: %s' % ('On' if c.get('enableCpu') else 'Off'),
-                'SMBus FAN: %s' % ('On' if c.get('enableFan') else 'Off'),
-                '-----',
-                'Preview now',
-                'Save to device',
-                'Reset device',
-                'Quit',
-            ]
+            if entries is None or self.dev is not dev:
+                # first pass or a different device: render every row
+                entries = [lbl(c) if callable(lbl) else lbl for _, lbl, _ in rows]
+            elif before is not None:
+                # otherwise only re-render rows whose cfg value the last action changed
+                for i, (key, lbl, _) in enumerate(rows):
+                    if key is not None and c.get(key) != before.get(key):
+                        entries[i] = lbl(c)
+            dev, before = self.dev, None
+
             sel = dlg_select(self._title(), entries)
             if sel < 0: break
 
-            label = entries[sel]
-            if   label.startswith('Device:'):      pass
-            elif label == 'Rescan':                self.rescan()
-            elif label == 'Manual IP':             self.set_manual_ip()
-            elif label == 'Set PSK':               self.set_psk()
-            elif label.startswith('Mode:'):        self.set_mode()
-            elif label.startswith('Master Off:'):  self.toggle_master_off()
-            elif label.startswith('Brightness:'):  self.set_slider('brightness','Brightness',1,255)
-            elif label.startswith('Speed:'):       self.set_slider('speed','Speed',0,255)
-            elif label.startswith('Intensity:'):   self.set_slider('intensity','Intensity',0,255)
-            elif label.startswith('Width / Gap:'): self.set_slider('width','Width / Gap',1,20)
-            elif label.startswith('Primary:'):     self.set_color('colorA','Primary')
-            elif label.startswith('Secondary:'):   self.set_color('colorB','Secondary')
-            elif label.startswith('Color C:'):     self.set_color('colorC','Color C')
-            elif label.startswith('Color D:'):     self.set_color('colorD','Color D')
-            elif label.startswith('Palette Size:'):self.set_palette()
-            elif label.startswith('Channel Counts:'): self.set_counts()
-            elif label.startswith('Reverse CH1:'): self.toggle_reverse(0)
-            elif label.startswith('Reverse CH2:'): self.toggle_reverse(1)
-            elif label.startswith('Reverse CH3:'): self.toggle_reverse(2)
-            elif label.startswith('Reverse CH4:'): self.toggle_reverse(3)
-            elif label.startswith('Custom: Loop:'): self.toggle_custom_loop()
-            elif label.startswith('Custom: Edit playlist'): self.edit_custom_seq()
-            elif label.startswith('Resume On Boot:'): self.toggle('resumeOnBoot','Resume On Boot')
-            elif label.startswith('SMBus CPU:'):      self.toggle('enableCpu','SMBus CPU')
-            elif label.startswith('SMBus FAN:'):      self.toggle('enableFan','SMBus FAN')
-            elif label == 'Preview now':              self.preview()
-            elif label == 'Save to device':           self.save()
-            elif label == 'Reset device':             self.reset()
-            elif label == 'Quit':                     break
+            fn = actions[sel]
+            if fn is None: continue
+            if fn is _QUIT: break
+            before = dict(c)
+            fn()
 
 # -------------------- run --------------------
 if __name__ == '__main__':